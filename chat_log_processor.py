@@ -1,32 +1,62 @@
+import sys
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Tuple
-from datetime import datetime
-import argparse
-import os
+from text_processor import TextProcessor, HAS_POLARS
 
 class ChatLogProcessor:
-    def __init__(self, max_rounds: int = 3):
+    IO_ENGINES = ('openpyxl', 'calamine', 'polars')
+    REQUIRED_COLUMNS = ['session_id', 'question_content', 'answer_content', 'create_time', 'user_name']
+    TEXT_DTYPES = {'question_content': 'string', 'answer_content': 'string', 'user_name': 'string'}
+    
+    def __init__(self, max_rounds: int = 3, io_engine: str = 'openpyxl', n_workers: int = 1):
         """
         初始化聊天日志处理器
         
         Args:
             max_rounds: 最大轮数，默认为3轮
+            io_engine: Excel读取引擎，可选openpyxl（默认）、calamine、polars
+            n_workers: 并行进程数，大于1时使用dask多进程处理session，默认为1
         """
+        if io_engine not in self.IO_ENGINES:
+            raise ValueError(f"不支持的io_engine: {io_engine}，可选: {self.IO_ENGINES}")
         self.max_rounds = max_rounds
+        self.io_engine = io_engine
+        self.n_workers = n_workers
     
     def load_data(self, file_path: str) -> pd.DataFrame:
         """
-        加载Excel数据
+        加载Excel数据（也支持Parquet文件）
         
         Args:
-            file_path: Excel文件路径
+            file_path: Excel或Parquet文件路径
             
         Returns:
             加载的数据框
         """
+        # 只读取需要的列，缺失的列交由validate_columns报告
+        usecols = self.REQUIRED_COLUMNS.__contains__
+        
         try:
-            df = pd.read_excel(file_path)
+            if file_path.endswith('.parquet'):
+                import pyarrow.parquet as pq
+                columns = [col for col in pq.read_schema(file_path).names if usecols(col)]
+                df = pd.read_parquet(file_path, engine='pyarrow', columns=columns)
+            elif self.io_engine == 'calamine':
+                df = pd.read_excel(file_path, engine='calamine', usecols=usecols, dtype=self.TEXT_DTYPES)
+            elif self.io_engine == 'polars':
+                import polars as pl
+                # polars要求columns中的列全部存在，缺列时在此处报错
+                df = pl.read_excel(
+                    file_path,
+                    columns=self.REQUIRED_COLUMNS,
+                    schema_overrides={col: pl.String for col in self.TEXT_DTYPES}
+                ).to_pandas()
+            else:
+                # pandas默认以read_only、data_only模式打开openpyxl工作簿
+                df = pd.read_excel(file_path, usecols=usecols, dtype=self.TEXT_DTYPES)
+            
+            # 各读取方式统一将文本列转为string类型
+            df = df.astype({col: dtype for col, dtype in self.TEXT_DTYPES.items() if col in df.columns})
             print(f"成功加载数据，共 {len(df)} 条记录")
             return df
         except Exception as e:
@@ -43,8 +73,7 @@ class ChatLogProcessor:
         Returns:
             是否验证通过
         """
-        required_columns = ['session_id', 'question_content', 'answer_content', 'create_time', 'user_name']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = [col for col in self.REQUIRED_COLUMNS if col not in df.columns]
         
         if missing_columns:
             print(f"缺少必需的列: {missing_columns}")
@@ -53,6 +82,24 @@ class ChatLogProcessor:
         print("数据列验证通过")
         return True
     
+    def normalize_questions(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        对问题列整列做文本预处理（全角转半角、小写、去不可见字符、空格归一）
+        
+        Args:
+            df: 数据框
+            
+        Returns:
+            处理后的数据框
+        """
+        # polars可用时走polars批量处理，否则逐行调用TextProcessor.process
+        if HAS_POLARS:
+            df['question_content'] = TextProcessor.process_polars(df['question_content'])
+        else:
+            df['question_content'] = TextProcessor.process_series(df['question_content'])
+        print("问题文本预处理完成")
+        return df
+    
     def sort_by_time(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         按时间排序
@@ -66,77 +113,101 @@ class ChatLogProcessor:
         # 确保create_time是datetime类型
         df['create_time'] = pd.to_datetime(df['create_time'])
         
+        # 低基数的分组键转为有序category，分组和统计时按整数编码处理
+        for col in ('session_id', 'user_name'):
+            df[col] = df[col].astype('category').cat.as_ordered()
+        
         # 按session_id和create_time排序
         df_sorted = df.sort_values(['session_id', 'create_time']).reset_index(drop=True)
         print("数据已按时间排序")
         return df_sorted
     
-    def process_session(self, session_data: pd.DataFrame) -> List[Dict]:
+    def _vectorized_session_transform(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        处理单个session的数据
+        对已按session_id和create_time排序的数据整体生成滑动窗口数据
         
         Args:
-            session_data: 单个session的数据
+            df: 排序后的数据框
             
         Returns:
-            处理后的数据列表
+            处理后的数据框
         """
-        results = []
-        session_id = session_data['session_id'].iloc[0]
-        user_name = session_data['user_name'].iloc[0]
-        
-        # 获取所有轮次的数据
-        rounds = []
-        for _, row in session_data.iterrows():
-            rounds.append({
-                'question': row['question_content'],
-                'answer': row['answer_content']
-            })
-        
-        # 生成滑动窗口数据
-        for i in range(len(rounds)):
-            # 当前轮次
-            current_round = rounds[i]
-            
-            # 上一轮问题（如果存在）
-            prev_question = rounds[i-1]['question'] if i > 0 else ""
-            
-            # 上一轮答案（如果存在）
-            prev_answer = rounds[i-1]['answer'] if i > 0 else ""
+        df = df[df['session_id'].notna()].reset_index(drop=True)
+        
+        # 每个session的首行：session_id与上一行不同
+        first_row_mask = df['session_id'] != df['session_id'].shift(1)
+        
+        # 上一轮问题和答案整体下移一行，session首行置空
+        prev_q = df['question_content'].shift(1).mask(first_row_mask, '')
+        prev_a = df['answer_content'].shift(1).mask(first_row_mask, '')
+        
+        # user_name沿用每个session首行的值
+        session_idx = first_row_mask.cumsum() - 1
+        user_name = df.loc[first_row_mask, 'user_name'].iloc[session_idx.values]
+        
+        # 直接由列数组一次性构建结果
+        return pd.DataFrame({
+            '上轮问题': prev_q.values,
+            '上轮答案': prev_a.values,
+            '本轮问题': df['question_content'].values,
+            'session_id': df['session_id'].values,
+            'user_name': user_name.values
+        })
+    
+    def _transform_partition(self, partition: pd.DataFrame) -> pd.DataFrame:
+        """
+        处理dask的单个分区（以session编号为索引，且session不跨分区）
+        
+        Args:
+            partition: 分区数据框
             
-            # 本轮问题
-            current_question = current_round['question']
+        Returns:
+            处理后的数据框
+        """
+        return self._vectorized_session_transform(partition.reset_index(drop=True))
+    
+    def process_session(self, session_data: pd.DataFrame) -> pd.DataFrame:
+        """
+        处理单个session的数据
+        
+        Args:
+            session_data: 单个session的数据
             
-            # 添加到结果中
-            results.append({
-                '上轮问题': prev_question,
-                '上轮答案': prev_answer,
-                '本轮问题': current_question,
-                'session_id': session_id,
-                'user_name': user_name
-            })
-        
-        return results
+        Returns:
+            处理后的数据框
+        """
+        return self._vectorized_session_transform(session_data)
     
     def process_all_sessions(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         处理所有session的数据
         
         Args:
-            df: 原始数据框
+            df: 已排序的原始数据框
             
         Returns:
             处理后的数据框
         """
-        all_results = []
-        
-        # 按session_id分组处理
-        for session_id, session_data in df.groupby('session_id'):
-            session_results = self.process_session(session_data)
-            all_results.extend(session_results)
-        
-        # 转换为DataFrame
-        result_df = pd.DataFrame(all_results)
+        if self.n_workers > 1:
+            import dask
+            import dask.dataframe as dd
+            
+            # 以session编号为有序索引分区，保证同一session不会被拆到不同分区
+            # 数据已按session_id排序，按出现顺序编号即单调递增，且兼容category类型
+            valid_df = df[df['session_id'].notna()]
+            indexed_df = valid_df.set_index(pd.Index(pd.factorize(valid_df['session_id'])[0]))
+            meta = self._vectorized_session_transform(df.iloc[:0])
+            
+            # 关闭dask默认的string[pyarrow]转换，保证输出dtype与单进程一致
+            with dask.config.set({'dataframe.convert-string': False}):
+                ddf = dd.from_pandas(indexed_df, npartitions=self.n_workers * 4, sort=True)
+                result_df = (
+                    ddf.map_partitions(self._transform_partition, meta=meta)
+                    .compute(scheduler='processes', num_workers=self.n_workers)
+                    .reset_index(drop=True)
+                )
+        else:
+            result_df = self._vectorized_session_transform(df)
         
         print(f"处理完成，共生成 {len(result_df)} 条标注数据")
         return result_df
@@ -151,14 +222,13 @@ class ChatLogProcessor:
         Returns:
             过滤后的数据框
         """
-        # 统计每个session的轮数
-        session_rounds = df.groupby('session_id').size()
+        # 统计每个session的轮数，直接按行对齐
+        sizes = df.groupby('session_id', observed=True)['session_id'].transform('size')
         
         # 过滤出轮数不超过max_rounds的session
-        valid_sessions = session_rounds[session_rounds <= self.max_rounds].index
-        filtered_df = df[df['session_id'].isin(valid_sessions)]
+        filtered_df = df[sizes <= self.max_rounds]
         
-        print(f"过滤后剩余 {len(filtered_df)} 条数据，涉及 {len(valid_sessions)} 个session")
+        print(f"过滤后剩余 {len(filtered_df)} 条数据，涉及 {filtered_df['session_id'].nunique()} 个session")
         return filtered_df
     
     def save_data(self, df: pd.DataFrame, output_path: str):
@@ -167,10 +237,13 @@ class ChatLogProcessor:
         
         Args:
             df: 要保存的数据框
-            output_path: 输出文件路径
+            output_path: 输出文件路径，以.parquet结尾时保存为Parquet
         """
         try:
-            df.to_excel(output_path, index=False)
+            if output_path.endswith('.parquet'):
+                df.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
+            else:
+                df.to_excel(output_path, index=False)
             print(f"数据已保存到: {output_path}")
         except Exception as e:
             print(f"保存数据失败: {e}")
@@ -190,19 +263,30 @@ class ChatLogProcessor:
         # 统计空值情况
         print("\n空值统计:")
         for col in ['上轮问题', '上轮答案', '本轮问题']:
-            empty_count = (df[col] == "").sum()
+            empty_count = (df[col].to_numpy(dtype=object, na_value=None) == "").sum()
             print(f"{col}: {empty_count} 条空值")
         
-        # 统计问题长度分布
+        # 统计问题长度分布，一次遍历得到长度数组，缺失值记为-1
         print("\n问题长度统计:")
-        question_lengths = df['本轮问题'].str.len()
-        print(f"平均长度: {question_lengths.mean():.2f}")
-        print(f"最短长度: {question_lengths.min()}")
-        print(f"最长长度: {question_lengths.max()}")
+        questions = df['本轮问题'].to_numpy(dtype=object)
+        question_lengths = np.fromiter(
+            (len(q) if isinstance(q, str) else -1 for q in questions),
+            dtype=np.int64, count=len(questions)
+        )
+        question_lengths = question_lengths[question_lengths >= 0]
+        if len(question_lengths):
+            print(f"平均长度: {question_lengths.mean():.2f}")
+            print(f"最短长度: {question_lengths.min()}")
+            print(f"最长长度: {question_lengths.max()}")
+        else:
+            print(f"平均长度: {np.nan:.2f}")
+            print(f"最短长度: {np.nan}")
+            print(f"最长长度: {np.nan}")
         
         # 按软件统计
         print("\n按软件统计:")
         software_stats = df['user_name'].value_counts()
+        software_stats = software_stats[software_stats > 0]
         for software, count in software_stats.items():
             print(f"{software}: {count} 条")
     
@@ -226,31 +310,40 @@ class ChatLogProcessor:
         if not self.validate_columns(df):
             return
         
-        # 3. 排序
+        # 3. 问题文本预处理
+        df = self.normalize_questions(df)
+        
+        # 4. 排序
         df = self.sort_by_time(df)
         
-        # 4. 处理所有session
+        # 5. 处理所有session
         result_df = self.process_all_sessions(df)
         
-        # 5. 按轮数过滤（可选）
+        # 6. 按轮数过滤（可选）
         if filter_rounds:
             result_df = self.filter_by_rounds(result_df)
         
-        # 6. 生成统计信息
+        # 7. 生成统计信息
         self.generate_statistics(result_df)
         
-        # 7. 保存数据
+        # 8. 保存数据
         self.save_data(result_df, output_path)
         
         print("处理完成！")
 
 def main():
     """主函数"""
+    import argparse
+    import os
+    
     parser = argparse.ArgumentParser(description='处理智能客服日志数据')
     parser.add_argument('input_file', help='输入Excel文件路径')
     parser.add_argument('output_file', help='输出Excel文件路径')
     parser.add_argument('--max_rounds', type=int, default=3, help='最大轮数（默认3）')
     parser.add_argument('--no_filter', action='store_true', help='不按轮数过滤')
+    parser.add_argument('--io_engine', choices=ChatLogProcessor.IO_ENGINES, default='openpyxl',
+                        help='Excel读取引擎（默认openpyxl）')
+    parser.add_argument('--n_workers', type=int, default=1, help='并行进程数（默认1，不并行）')
     
     args = parser.parse_args()
     
@@ -260,7 +353,9 @@ def main():
         return
     
     # 创建处理器
-    processor = ChatLogProcessor(max_rounds=args.max_rounds)
+    processor = ChatLogProcessor(
+        max_rounds=args.max_rounds, io_engine=args.io_engine, n_workers=args.n_workers
+    )
     
     # 处理数据
     processor.process(
@@ -271,10 +366,11 @@ def main():
 
 if __name__ == "__main__":
     # 如果直接运行，使用示例参数
-    if len(os.sys.argv) == 1:
+    if len(sys.argv) == 1:
         print("使用示例:")
         print("python chat_log_processor.py input.xlsx output.xlsx")
         print("python chat_log_processor.py input.xlsx output.xlsx --max_rounds 5")
         print("python chat_log_processor.py input.xlsx output.xlsx --no_filter")
+        print("python chat_log_processor.py input.xlsx output.parquet --io_engine calamine")
     else:
         main() 
\ No newline at end of file
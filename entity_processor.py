@@ -1,3 +1,4 @@
+from bisect import bisect_left
 from text_processor import TextProcessor
 from typing import List, Dict, Optional, Tuple
 
@@ -59,8 +60,26 @@ class EntityProcessor:
         # }
         return None
     
-    def expand_entity_without_overlap(self, query: str, entity: Dict, 
-                                    all_entities: List[Dict], custom_chars: str = '',
+    def build_boundary_index(self, entities: List[Dict]) -> Tuple[List[int], List[int]]:
+        """
+        为已按start_index排序的实体构建边界索引，供补全时的重叠检查使用
+        
+        Args:
+            entities: 按start_index排序的实体列表
+            
+        Returns:
+            (starts, max_ends)，starts为各实体的start_index，
+            max_ends[i]为前i个实体end_index的最大值（i为0时为-1）
+        """
+        starts = [e['start_index'] for e in entities]
+        max_ends = [-1]
+        for e in entities[:-1]:
+            max_ends.append(max(max_ends[-1], e['end_index']))
+        return starts, max_ends
+    
+    def expand_entity_without_overlap(self, query: str, entity: Dict, idx: int,
+                                    starts: List[int], max_ends: List[int],
+                                    custom_chars: str = '',
                                     forbidden_start_chars: str = '', 
                                     forbidden_end_chars: str = '') -> str:
         """
@@ -69,7 +88,8 @@ class EntityProcessor:
         Args:
             query: 原始查询字符串
             entity: 当前实体信息
-            all_entities: 所有实体列表
+            idx: 当前实体在排序后实体列表中的下标
+            starts, max_ends: build_boundary_index返回的边界索引
             custom_chars: 自定义字符
             forbidden_start_chars: 不能出现在首位的字符
             forbidden_end_chars: 不能出现在末位的字符
@@ -82,26 +102,19 @@ class EntityProcessor:
         current_end = entity['end_index']
         entity_text = entity['text']
         
-        # 找到其他实体的边界
-        other_boundaries = []
-        for other_entity in all_entities:
-            if other_entity != entity:
-                other_boundaries.append((other_entity['start_index'], other_entity['end_index']))
-        
-        # 使用expand_substring进行补全
-        expanded_text = self.text_processor.expand_substring(
-            query, entity_text, custom_chars, forbidden_start_chars, forbidden_end_chars
+        # 使用expand_substring_at在已知位置上进行补全
+        expanded_start, expanded_end = self.text_processor.expand_substring_at(
+            query, current_start, current_end, custom_chars, forbidden_start_chars, forbidden_end_chars
         )
+        expanded_text = query[expanded_start:expanded_end]
         
-        # 找到扩展后文本在原始查询中的位置
-        expanded_start = query.find(expanded_text)
-        expanded_end = expanded_start + len(expanded_text)
+        # 检查是否与左侧实体重叠：左侧实体的最大end_index超过补全后的开始位置
+        if max_ends[idx] > expanded_start:
+            return entity_text
         
-        # 检查是否与其他实体重叠
-        for start, end in other_boundaries:
-            if (expanded_start < end and expanded_end > start):
-                # 有重叠，返回原始实体
-                return entity_text
+        # 检查是否与右侧实体重叠：右侧存在start_index小于补全后结束位置的实体
+        if bisect_left(starts, expanded_end, idx + 1) > idx + 1:
+            return entity_text
         
         return expanded_text
     
@@ -124,18 +137,15 @@ class EntityProcessor:
             query, custom_chars, start_constraint, end_constraint
         )
         
-        entities = []
-        for entity_text in potential_entities:
-            start_index = query.find(entity_text)
-            end_index = start_index + len(entity_text)
-            entities.append({
+        return [
+            {
                 'text': entity_text,
                 'start_index': start_index,
                 'end_index': end_index,
                 'type': 'DETECTED'
-            })
-        
-        return entities
+            }
+            for entity_text, start_index, end_index in potential_entities
+        ]
     
     def process_query(self, query: str, custom_chars: str = '',
                      forbidden_start_chars: str = '', forbidden_end_chars: str = '',
@@ -164,12 +174,13 @@ class EntityProcessor:
         if entities:
             # 按start_index排序
             entities.sort(key=lambda x: x['start_index'])
+            starts, max_ends = self.build_boundary_index(entities)
             
             final_entities = []
-            for entity in entities:
+            for idx, entity in enumerate(entities):
                 # 对每个实体进行补全
                 expanded_text = self.expand_entity_without_overlap(
-                    processed_query, entity, entities, custom_chars,
+                    processed_query, entity, idx, starts, max_ends, custom_chars,
                     forbidden_start_chars, forbidden_end_chars
                 )
                 
@@ -198,12 +209,14 @@ class EntityProcessor:
             potential_entities = self.detect_potential_entities(
                 processed_query, custom_chars, start_constraint, end_constraint
             )
+            potential_entities.sort(key=lambda x: x['start_index'])
+            starts, max_ends = self.build_boundary_index(potential_entities)
             
             final_entities = []
-            for entity in potential_entities:
+            for idx, entity in enumerate(potential_entities):
                 # 对每个潜在实体进行补全
                 expanded_text = self.expand_entity_without_overlap(
-                    processed_query, entity, potential_entities, custom_chars,
+                    processed_query, entity, idx, starts, max_ends, custom_chars,
                     forbidden_start_chars, forbidden_end_chars
                 )
                 
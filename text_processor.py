@@ -1,5 +1,84 @@
 import re
 import unicodedata
+from functools import lru_cache
+from importlib.util import find_spec
+
+# polars批量处理需要polars以及转换回pandas用的pyarrow，只检测不导入
+HAS_POLARS = find_spec('polars') is not None and find_spec('pyarrow') is not None
+
+# 预编译的固定正则
+_MULTISPACE = re.compile(r' +')
+_ENG = re.compile(r'[a-zA-Z]+')
+_ALNUM = re.compile(r'[a-zA-Z0-9]+')
+_ALNUM_FULL = re.compile(r'^[a-zA-Z0-9]+$')
+
+# str.translate使用的字符映射表
+# 收费空格（常见为\u00A0等），直接删除
+_NBSP_TABLE = {ord(ch): None for ch in '\u00A0\u2007\u202F'}
+
+# 不可见字符（零宽字符、BOM、方向控制符以及ASCII控制字符），直接删除
+_INVISIBLE_TABLE = {ord(ch): None for ch in (
+    '\u200b'  # 零宽空格
+    '\u200c'  # 零宽非连接符
+    '\u200d'  # 零宽连接符
+    '\ufeff'  # BOM
+    '\u202a\u202b\u202c\u202d\u202e'  # 方向控制符
+)}
+_INVISIBLE_TABLE.update({i: None for i in range(0x20)})
+_INVISIBLE_TABLE[0x7F] = None
+
+# 不同格式的空格（全角空格、各种unicode空格），转为普通空格
+_SPACE_TABLE = {ord(ch): 0x20 for ch in (
+    '\u3000'  # 全角空格
+    '\u00A0'  # 不间断空格
+    '\u2000\u2001\u2002\u2003\u2004\u2005'
+    '\u2006\u2007\u2008\u2009\u200A\u202F\u205F\u2060'
+)}
+
+# 综合处理用的合并表，与process中先删收费空格再转空格的顺序一致
+_SCRUB_TABLE = {**_SPACE_TABLE, **_INVISIBLE_TABLE, **_NBSP_TABLE}
+
+
+def _regex_class(codepoints) -> str:
+    # 由码点构建正则字符集，使用\x{...}转义以兼容polars（Rust regex）
+    return '[' + ''.join(f'\\x{{{cp:X}}}' for cp in sorted(codepoints)) + ']'
+
+
+# polars批量处理用的正则，分别对应合并表中删除和转空格的字符
+_DELETE_CLASS = _regex_class(cp for cp, target in _SCRUB_TABLE.items() if target is None)
+_SPACE_CLASS = _regex_class(cp for cp, target in _SCRUB_TABLE.items() if target == 0x20)
+
+
+@lru_cache(maxsize=64)
+def _compile_custom(custom_chars: str, start_constraint: bool, end_constraint: bool):
+    # 按(自定义字符, 首位约束, 末位约束)缓存编译后的正则
+    base_chars = r'[a-zA-Z0-9' + re.escape(custom_chars) + r']'
+
+    if start_constraint and end_constraint:
+        # 首尾都有约束
+        pattern = f'^{base_chars}+$'
+    elif start_constraint:
+        # 只有首部约束
+        pattern = f'^{base_chars}+'
+    elif end_constraint:
+        # 只有尾部约束
+        pattern = f'{base_chars}+$'
+    else:
+        # 无约束
+        pattern = f'{base_chars}+'
+
+    return re.compile(pattern)
+
+
+# 字母数字字符，用于逐字符的集合判断
+_ALNUM_CHARS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+
+
+@lru_cache(maxsize=64)
+def _char_set(chars: str, with_alnum: bool = True) -> frozenset:
+    # 缓存逐字符判断用的字符集合，with_alnum为True时包含字母数字
+    return frozenset(_ALNUM_CHARS + chars) if with_alnum else frozenset(chars)
+
 
 class TextProcessor:
     @staticmethod
@@ -10,7 +89,7 @@ class TextProcessor:
     @staticmethod
     def remove_non_breaking_spaces(text: str) -> str:
         # 去除收费空格（常见为\u00A0等）
-        return text.replace('\u00A0', '').replace('\u2007', '').replace('\u202F', '')
+        return text.translate(_NBSP_TABLE)
 
     @staticmethod
     def to_lower(text: str) -> str:
@@ -20,37 +99,18 @@ class TextProcessor:
     @staticmethod
     def remove_invisible_chars(text: str) -> str:
         # 去除各种不可见字符（如零宽空格、控制字符等）
-        invisible_chars = [
-            '\u200b',  # 零宽空格
-            '\u200c',  # 零宽非连接符
-            '\u200d',  # 零宽连接符
-            '\ufeff',  # BOM
-            '\u202a', '\u202b', '\u202c', '\u202d', '\u202e',  # 方向控制符
-        ]
-        for ch in invisible_chars:
-            text = text.replace(ch, '')
-        # 去除ASCII控制字符
-        text = re.sub(r'[\x00-\x1F\x7F]', '', text)
-        return text
+        return text.translate(_INVISIBLE_TABLE)
 
     @staticmethod
     def normalize_spaces(text: str) -> str:
         # 不同格式的空格转为普通空格
         # 包括全角空格、各种unicode空格
-        space_chars = [
-            '\u3000',  # 全角空格
-            '\u00A0',  # 不间断空格
-            '\u2000', '\u2001', '\u2002', '\u2003', '\u2004', '\u2005',
-            '\u2006', '\u2007', '\u2008', '\u2009', '\u200A', '\u202F', '\u205F', '\u2060',
-        ]
-        for ch in space_chars:
-            text = text.replace(ch, ' ')
-        return text
+        return text.translate(_SPACE_TABLE)
 
     @staticmethod
     def collapse_spaces(text: str) -> str:
         # 多个空格合并为一个空格
-        return re.sub(r' +', ' ', text)
+        return _MULTISPACE.sub(' ', text)
 
     @staticmethod
     def detect_continuous_english(text: str) -> list:
@@ -58,8 +118,7 @@ class TextProcessor:
         检测一个字符串中连续的英文
         返回所有连续英文片段的列表
         """
-        pattern = r'[a-zA-Z]+'
-        return re.findall(pattern, text)
+        return _ENG.findall(text)
 
     @staticmethod
     def detect_continuous_alphanumeric(text: str) -> list:
@@ -67,8 +126,7 @@ class TextProcessor:
         检测一个字符串中连续的英文或数字
         返回所有连续英文或数字片段的列表
         """
-        pattern = r'[a-zA-Z0-9]+'
-        return re.findall(pattern, text)
+        return _ALNUM.findall(text)
 
     @staticmethod
     def detect_continuous_custom_chars(text: str, custom_chars: str = '',
@@ -84,31 +142,53 @@ class TextProcessor:
             end_constraint: 开关2，只有英文、数字以及给定的字符可以出现在尾
         
         Returns:
-            符合条件的连续字符片段列表
+            符合条件的连续字符片段列表，每项为(片段, 开始位置, 结束位置)
+        """
+        pattern = _compile_custom(custom_chars, start_constraint, end_constraint)
+        return [(m.group(), m.start(), m.end()) for m in pattern.finditer(text)]
+
+    @staticmethod
+    def expand_substring_at(text: str, start_pos: int, end_pos: int, custom_chars: str = '',
+                            forbidden_start_chars: str = '', forbidden_end_chars: str = '') -> tuple:
+        """
+        对text[start_pos:end_pos]前后进行扩展，如果前后是字母、数字以及用户给定的字符
+        
+        Args:
+            text: 原始字符串
+            start_pos: 子串开始位置
+            end_pos: 子串结束位置
+            custom_chars: 用户给定的额外允许字符
+            forbidden_start_chars: 开关1，不能出现在首位的字符
+            forbidden_end_chars: 开关2，不能出现在末位的字符
+        
+        Returns:
+            扩展后的(开始位置, 结束位置)
         """
-        # 构建基础字符集：英文、数字 + 自定义字符
-        base_chars = r'[a-zA-Z0-9' + re.escape(custom_chars) + r']'
+        # 构建允许扩展的字符集以及首位、末位禁止的字符集
+        allowed = _char_set(custom_chars)
+        forbidden_start = _char_set(forbidden_start_chars, False)
+        forbidden_end = _char_set(forbidden_end_chars, False)
         
-        if start_constraint and end_constraint:
-            # 首尾都有约束
-            pattern = f'^{base_chars}+$'
-        elif start_constraint:
-            # 只有首部约束
-            pattern = f'^{base_chars}+'
-        elif end_constraint:
-            # 只有尾部约束
-            pattern = f'{base_chars}+$'
-        else:
-            # 无约束
-            pattern = f'{base_chars}+'
+        # 向前扩展，遇到非允许字符或违反首位约束时停止
+        expanded_start = start_pos
+        while (expanded_start > 0 and text[expanded_start - 1] in allowed
+               and text[expanded_start - 1] not in forbidden_start):
+            expanded_start -= 1
+        
+        # 向后扩展，遇到非允许字符或违反末位约束时停止
+        expanded_end = end_pos
+        while (expanded_end < len(text) and text[expanded_end] in allowed
+               and text[expanded_end] not in forbidden_end):
+            expanded_end += 1
         
-        return re.findall(pattern, text)
+        return expanded_start, expanded_end
 
     @staticmethod
     def expand_substring(text: str, substring: str, custom_chars: str = '',
                         forbidden_start_chars: str = '', forbidden_end_chars: str = '') -> str:
         """
         对子串前后进行扩展，如果前后是字母、数字以及用户给定的字符
+        以子串在文本中第一次出现的位置为准，已知位置时请使用expand_substring_at
         
         Args:
             text: 原始字符串
@@ -123,43 +203,13 @@ class TextProcessor:
         if substring not in text:
             return substring
         
-        # 构建允许扩展的字符集
-        allowed_chars = r'[a-zA-Z0-9' + re.escape(custom_chars) + r']'
-        
-        # 构建不允许出现在首位的字符集
-        forbidden_start_pattern = r'[' + re.escape(forbidden_start_chars) + r']' if forbidden_start_chars else None
-        
-        # 构建不允许出现在末位的字符集
-        forbidden_end_pattern = r'[' + re.escape(forbidden_end_chars) + r']' if forbidden_end_chars else None
-        
         # 找到子串在文本中的位置
         start_pos = text.find(substring)
         end_pos = start_pos + len(substring)
         
-        # 向前扩展
-        expanded_start = start_pos
-        while expanded_start > 0:
-            prev_char = text[expanded_start - 1]
-            if re.match(allowed_chars, prev_char):
-                # 检查是否违反首位约束
-                if forbidden_start_pattern and re.match(forbidden_start_pattern, prev_char):
-                    break
-                expanded_start -= 1
-            else:
-                break
-        
-        # 向后扩展
-        expanded_end = end_pos
-        while expanded_end < len(text):
-            next_char = text[expanded_end]
-            if re.match(allowed_chars, next_char):
-                # 检查是否违反末位约束
-                if forbidden_end_pattern and re.match(forbidden_end_pattern, next_char):
-                    break
-                expanded_end += 1
-            else:
-                break
-        
+        expanded_start, expanded_end = TextProcessor.expand_substring_at(
+            text, start_pos, end_pos, custom_chars, forbidden_start_chars, forbidden_end_chars
+        )
         return text[expanded_start:expanded_end]
 
     @staticmethod
@@ -167,7 +217,7 @@ class TextProcessor:
         """
         检测一个字符串仅由字母和数字构成
         """
-        return bool(re.fullmatch(r'[a-zA-Z0-9]+', text))
+        return bool(_ALNUM_FULL.fullmatch(text))
 
     @staticmethod
     def is_substring_surrounded_by_non_custom(text: str, start, end, custom_chars: str = '') -> bool:
@@ -175,17 +225,58 @@ class TextProcessor:
         给定一个字符串和字符串的子串的start(index), end(index)，检测这个子串的左右两边不存在字母数字和自定义的字符
         """
         # 构建检测字符集
-        check_chars = r'[a-zA-Z0-9' + re.escape(custom_chars) + r']'
-        left_ok = (start == 0) or (not re.match(check_chars, text[start-1]))
-        right_ok = (end == len(text)) or (not re.match(check_chars, text[end]) )
+        check_chars = _char_set(custom_chars)
+        left_ok = (start == 0) or (text[start-1] not in check_chars)
+        right_ok = (end == len(text)) or (text[end] not in check_chars)
         return left_ok and right_ok
 
+    @staticmethod
+    def process_series(s):
+        """
+        对整列文本（pandas Series）做与process相同的综合处理，缺失值保持不变
+        输入列的元素须为str或缺失值，其他类型会在process中抛出TypeError
+        """
+        return s.map(TextProcessor().process, na_action='ignore')
+
+    @staticmethod
+    def process_polars(s):
+        """
+        使用polars字符串表达式对整列文本做与process相同的综合处理
+        
+        Args:
+            s: pandas Series或polars Series
+        
+        Returns:
+            处理后的pandas Series（输入为pandas时保留原dtype、索引和名称）
+        """
+        if not HAS_POLARS:
+            raise ImportError("process_polars需要安装polars和pyarrow")
+        import polars as pl
+        
+        orig = None
+        if not isinstance(s, pl.Series):
+            orig = s
+            s = pl.from_pandas(s)
+        s = (
+            s.str.normalize('NFKC')
+            .str.to_lowercase()
+            .str.replace_all(_DELETE_CLASS, '')
+            .str.replace_all(_SPACE_CLASS, ' ')
+            .str.replace_all(' +', ' ')
+            .str.strip_chars()
+        )
+        result = s.to_pandas()
+        if orig is not None:
+            # 恢复输入的dtype、索引和名称，避免输出类型随是否安装polars而变化
+            result = result.astype(orig.dtype)
+            result.index = orig.index
+            result.name = orig.name
+        return result
+
     def process(self, text: str) -> str:
-        # 综合处理
+        # 综合处理：全角转半角、转小写后一次translate完成删除和空格归一
         text = self.fullwidth_to_halfwidth(text)
-        text = self.remove_non_breaking_spaces(text)
         text = self.to_lower(text)
-        text = self.remove_invisible_chars(text)
-        text = self.normalize_spaces(text)
+        text = text.translate(_SCRUB_TABLE)
         text = self.collapse_spaces(text)
-        return text.strip() 
+        return text.strip()